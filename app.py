@@ -5,17 +5,112 @@ import pandas as pd
 from collections import OrderedDict
 import os
 import json
+import logging
 import numpy as np
+import shutil
+import gzip
+import hashlib
+import mimetypes
+import threading
+import time
+import pyarrow as pa
+import brotli
+import httplib2
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FetchTimeoutError
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-from azure.storage.blob import BlobServiceClient
-from flask import Flask, render_template, request, send_file
+from azure.storage.blob import BlobServiceClient, ContentSettings
+from flask import Flask, render_template, request, send_file, jsonify, session
 from markupsafe import escape
 from datetime import date
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 
 app = Flask(__name__)
 load_dotenv()  # take environment variables from .env
+app.logger.setLevel(logging.INFO)
+
+
+def get_operations():
+    # registry of operations (vessels), each with its own forms, sheet and password
+    # OPERATIONS: {"<name>": {"asset": .., "asset_medevac": .., "asset_disembark": ..,
+    #                         "sheet": .., "password": .., "container": ..,
+    #                         "logic_app_trigger": ..}}
+    # "container" and "logic_app_trigger" are optional,
+    # without OPERATIONS a single "default" operation is read from the env variables
+    if os.getenv("OPERATIONS"):
+        operations = json.loads(os.getenv("OPERATIONS"))
+        required_keys = ["asset", "asset_medevac", "asset_disembark", "sheet"]
+        for name, operation in operations.items():
+            missing = [k for k in required_keys + ["password"] if not operation.get(k)]
+            if missing:
+                raise ValueError(f"OPERATIONS: {name} is missing {', '.join(missing)}")
+        passwords = [operation["password"] for operation in operations.values()]
+        if len(set(passwords)) != len(passwords):
+            raise ValueError("OPERATIONS: passwords must be unique per operation")
+    else:
+        operations = {
+            "default": {
+                "asset": os.getenv("ASSET"),
+                "asset_medevac": os.getenv("ASSETMEDEVAC"),
+                "asset_disembark": os.getenv("ASSETDISEMBARK"),
+                "sheet": os.getenv("GOOGLESHEETID"),
+                "password": os.getenv("PASSWORD"),
+            }
+        }
+    for operation in operations.values():
+        operation.setdefault("container", "reporting")
+        operation.setdefault("logic_app_trigger", os.getenv("LOGICAPPTRIGGER"))
+    return operations
+
+
+OPERATIONS = get_operations()
+
+# signs the session with the operation; without SECRETKEY, derive a key from
+# the (server-side) kobo token and passwords so existing deployments keep working
+if os.getenv("SECRETKEY"):
+    app.secret_key = os.getenv("SECRETKEY")
+else:
+    app.logger.warning("SECRETKEY is not set, deriving it from TOKEN and passwords")
+    secrets = [os.getenv("TOKEN") or ""]
+    secrets += sorted(str(operation["password"]) for operation in OPERATIONS.values())
+    app.secret_key = hashlib.sha256("\n".join(secrets).encode()).hexdigest()
+# kobo form of each kind, per operation
+ASSET_KEYS = {
+    "form": "asset",
+    "medevac": "asset_medevac",
+    "disembark": "asset_disembark",
+}
+
+# compression of everything sent over the (satellite) link
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESSMINSIZE", "500"))  # bytes
+# opt-in: the reader of the reports (Logic App) must handle gzip Content-Encoding
+COMPRESS_BLOBS = os.getenv("COMPRESSBLOBS", "false").lower() == "true"
+# already compressed, not worth compressing again
+COMPRESSED_MIMETYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "application/zip",
+    "application/gzip",
+    "application/vnd.openxmlformats-officedocument.",  # xlsx, docx, pptx
+)
+# bytes before and after compression, per channel, since this worker started
+COMPRESSION_STATS = {
+    channel: {"count": 0, "bytes_raw": 0, "bytes_sent": 0}
+    for channel in ["response", "blob", "kobo"]
+}
+_stats_lock = threading.Lock()
+
+
+def count_bytes(channel, bytes_raw, bytes_sent):
+    with _stats_lock:
+        stats = COMPRESSION_STATS[channel]
+        stats["count"] += 1
+        stats["bytes_raw"] += bytes_raw
+        stats["bytes_sent"] += bytes_sent
+    app.logger.info(f"{channel}: {bytes_raw} bytes, {bytes_sent} bytes sent")
 
 
 def get_blob_service_client(container, blob_path):
@@ -29,7 +124,22 @@ def upload_blob(container, blob_path, data_path):
     # upload data to azure blob storage
     blob_client = get_blob_service_client(container, blob_path)
     with open(data_path, "rb") as data:
+        data = data.read()
+    if not COMPRESS_BLOBS:
         blob_client.upload_blob(data, overwrite=True)
+        count_bytes("blob", len(data), len(data))
+        return
+    # store gzipped, readers that honour Content-Encoding get the original file
+    data_gzip = gzip.compress(data)
+    content_type = mimetypes.guess_type(blob_path)[0] or "application/octet-stream"
+    blob_client.upload_blob(
+        data_gzip,
+        overwrite=True,
+        content_settings=ContentSettings(
+            content_type=content_type, content_encoding="gzip"
+        ),
+    )
+    count_bytes("blob", len(data), len(data_gzip))
 
 
 def download_blob(container, blob_path, data_path):
@@ -39,7 +149,8 @@ def download_blob(container, blob_path, data_path):
         download_file.write(blob_client.download_blob().readall())
 
 
-def process_data(df_form, rescue_number=None, return_data=False, report=False):
+def process_data(data, operation, rescue_number=None, return_data=False, report=False):
+    df_form, rotation_no = data["form"]
     if "rescue_number" in df_form.columns:
         rescues = df_form["rescue_number"].unique().tolist()
     else:
@@ -83,7 +194,7 @@ def process_data(df_form, rescue_number=None, return_data=False, report=False):
                 total_rescued_dict[rn] = len(df_form_rn)
 
     # check if there have been medevacs
-    df_medevacs, rotation_no = get_data(os.getenv("ASSETMEDEVAC"))
+    df_medevacs, rotation_no = data["medevac"]
     medevacs, medevacs_meta = 0, []
     try:
         df_medevacs = pd.merge(
@@ -143,7 +254,7 @@ def process_data(df_form, rescue_number=None, return_data=False, report=False):
             )
 
     # check if there have been disembarkations
-    df_disembark, rotation_no = get_data(os.getenv("ASSETDISEMBARK"))
+    df_disembark, rotation_no = data["disembark"]
     for ix, row in df_disembark.iterrows():
         if row["type"] == "rescue":
             rescue_no = row["rescue_number"].split(" ")
@@ -388,6 +499,7 @@ def process_data(df_form, rescue_number=None, return_data=False, report=False):
         "medevacs": medevacs,
         "medevacs_meta": medevacs_meta,
         "selected_rescue": escape(str(rescue_number)),
+        "operation": operation,
     }
 
     template = render_template(
@@ -419,6 +531,7 @@ def process_data(df_form, rescue_number=None, return_data=False, report=False):
         date=dt_,
         medevacs=medevacs,
         selected_rescue=str(rescue_number),
+        operation=operation,
     )
 
     if report:
@@ -427,40 +540,75 @@ def process_data(df_form, rescue_number=None, return_data=False, report=False):
         return template
 
 
-def get_data(asset):
+# all upstream calls of all operations go through one bounded, rate-limited pool
+FETCH_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("FETCHWORKERS", "4")))
+FETCH_INTERVAL = 1.0 / float(os.getenv("FETCHRATE", "5"))  # max requests per second
+FETCH_TIMEOUT = float(os.getenv("FETCHTIMEOUT", "60"))  # seconds
+# retries of a kobo request; all attempts (and backoff) fit in FETCH_TIMEOUT
+FETCH_RETRIES = 2
+FETCH_ATTEMPT_TIMEOUT = FETCH_TIMEOUT / (FETCH_RETRIES + 2)
+_fetch_lock = threading.Lock()
+_fetch_next = [0.0]
+
+
+def wait_for_fetch_slot():
+    # space out upstream requests to at most FETCHRATE per second
+    with _fetch_lock:
+        now = time.monotonic()
+        wait = _fetch_next[0] - now
+        _fetch_next[0] = max(now, _fetch_next[0]) + FETCH_INTERVAL
+    if wait > 0:
+        time.sleep(wait)
+
+
+def get_kobo_data(asset):
     # get data from kobo
-    headers = {"Authorization": f'Token {os.getenv("TOKEN")}'}
+    wait_for_fetch_slot()
+    headers = {
+        "Authorization": f'Token {os.getenv("TOKEN")}',
+        "Accept-Encoding": "br, gzip",
+    }
     session = requests.Session()
-    retry = Retry(connect=10, backoff_factor=0.5)
+    retry = Retry(total=FETCH_RETRIES, connect=FETCH_RETRIES, backoff_factor=0.5)
     adapter = HTTPAdapter(max_retries=retry)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     data_request = session.get(
-        f"https://kobo.ifrc.org/api/v2/assets/{asset}/data.json", headers=headers
+        f"https://kobo.ifrc.org/api/v2/assets/{asset}/data.json",
+        headers=headers,
+        timeout=FETCH_ATTEMPT_TIMEOUT,
     )
-    data = data_request.json()
+    # raw.tell() is the number of (compressed) bytes read from the wire
+    count_bytes("kobo", len(data_request.content), data_request.raw.tell())
+    return data_request.json()
+
 
+def get_rotations(sheet_id):
     # get rotation info
+    wait_for_fetch_slot()
     SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
-    SAMPLE_SPREADSHEET_ID = os.getenv("GOOGLESHEETID")
     SAMPLE_RANGE_NAME = "Rotations!A:C"
     sa_file = json.loads(os.getenv("GOOGLESERVICEACCUNT"))
     creds = service_account.Credentials.from_service_account_info(
         sa_file, scopes=SCOPES
     )
-    service = build("sheets", "v4", credentials=creds)
+    http = AuthorizedHttp(creds, http=httplib2.Http(timeout=FETCH_TIMEOUT))
+    service = build("sheets", "v4", http=http)
     # Call the Sheets API
     sheet = service.spreadsheets()
     result = (
-        sheet.values()
-        .get(spreadsheetId=SAMPLE_SPREADSHEET_ID, range=SAMPLE_RANGE_NAME)
-        .execute()
+        sheet.values().get(spreadsheetId=sheet_id, range=SAMPLE_RANGE_NAME).execute()
     )
     values = result.get("values", [])
     df = pd.DataFrame.from_records(values[1:], columns=values[0])
     df["Start date"] = pd.to_datetime(df["Start date"], dayfirst=True)
     df["End date"] = pd.to_datetime(df["End date"], dayfirst=True)
     df["Rotation No"] = df["Rotation No"].astype(float)
+    return df
+
+
+def get_data(data, df):
+    # filter kobo data on the current rotation
     rotation_no = max(df["Rotation No"])
     start_date_ = pd.to_datetime(date.today(), utc=True)
     end_date_ = pd.to_datetime(date.today(), utc=True)
@@ -497,13 +645,273 @@ def get_data(asset):
     return df_form, rotation_no
 
 
+def fetch_operations(operations, timeout=FETCH_TIMEOUT):
+    # fetch all forms and the rotations of the operations concurrently
+    # raises FetchTimeoutError if they are not all there within timeout
+    deadline = time.monotonic() + timeout
+    futures = {
+        name: (
+            FETCH_POOL.submit(get_rotations, operation["sheet"]),
+            {
+                kind: FETCH_POOL.submit(get_kobo_data, operation[asset_key])
+                for kind, asset_key in ASSET_KEYS.items()
+            },
+        )
+        for name, operation in operations.items()
+    }
+    data = {}
+    try:
+        for name, (rotations, kobo_data) in futures.items():
+            df = rotations.result(timeout=max(0, deadline - time.monotonic()))
+            data[name] = {
+                kind: get_data(
+                    future.result(timeout=max(0, deadline - time.monotonic())), df
+                )
+                for kind, future in kobo_data.items()
+            }
+    except FetchTimeoutError:
+        # free the pool for other operations, running requests end by their timeout
+        for rotations, kobo_data in futures.values():
+            rotations.cancel()
+            for future in kobo_data.values():
+                future.cancel()
+        raise
+    return data
+
+
+def fetch_operation(operation):
+    return fetch_operations({"operation": operation})["operation"]
+
+
+# per-operation cache of fetched data, valid for CACHETTL seconds
+CACHE_TTL = float(os.getenv("CACHETTL", "60"))
+_cache = {name: {"time": None, "data": None} for name in OPERATIONS}
+_cache_locks = {name: threading.Lock() for name in OPERATIONS}
+
+
+def copy_data(data):
+    return {kind: (df.copy(), rotation_no) for kind, (df, rotation_no) in data.items()}
+
+
+def get_cached_operation(name):
+    # one fetch per operation at a time, concurrent requests wait for its result
+    with _cache_locks[name]:
+        cache = _cache[name]
+        if cache["time"] is None or time.monotonic() - cache["time"] > CACHE_TTL:
+            cache["data"] = fetch_operation(OPERATIONS[name])
+            cache["time"] = time.monotonic()
+        return copy_data(cache["data"])
+
+
+# snapshot of the synced data, shared by all workers
+# SNAPSHOTDIR/CURRENT holds the version,
+# SNAPSHOTDIR/<version>/<operation>.<kind>.arrow the data
+SNAPSHOT_KEEP = 2
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOTMAXAGE", "600"))  # seconds
+SNAPSHOT_VERSION_FORMAT = "%Y%m%dT%H%M%S%f"
+# (version, {"<operation>.<kind>": (df, rotation_no)}), replaced in one assignment
+_snapshot = {"current": (None, {})}
+
+
+def to_snapshot_value(x):
+    # arrow needs one type per column: kobo's nested fields (attachments,
+    # geolocation, ...) become json, other non-string values text
+    if isinstance(x, (list, dict)):
+        return json.dumps(x)
+    if isinstance(x, str) or pd.isna(x):
+        return x
+    return str(x)
+
+
+def write_snapshot(snapshot_dir):
+    # fetch all operations and publish them as a new snapshot version
+    tables = {}
+    data = fetch_operations(OPERATIONS, timeout=FETCH_TIMEOUT * len(OPERATIONS))
+    for name, operation_data in data.items():
+        for kind, kind_data in operation_data.items():
+            tables[f"{name}.{kind}"] = kind_data
+
+    # write to a temporary directory, renamed to the version when complete
+    version = datetime.now(timezone.utc).strftime(SNAPSHOT_VERSION_FORMAT)
+    version_dir = os.path.join(snapshot_dir, version)
+    tmp_dir = os.path.join(snapshot_dir, f".{version}.tmp")
+    os.makedirs(tmp_dir)
+    try:
+        for table_name, (df_form, rotation_no) in tables.items():
+            for col in df_form.columns:
+                if df_form[col].dtype == object:
+                    df_form[col] = df_form[col].map(to_snapshot_value)
+            table = pa.Table.from_pandas(df_form, preserve_index=False)
+            table = table.replace_schema_metadata(
+                {
+                    **(table.schema.metadata or {}),
+                    b"rotation_no": json.dumps(float(rotation_no)).encode(),
+                }
+            )
+            table_path = os.path.join(tmp_dir, f"{table_name}.arrow")
+            with pa.OSFile(table_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        os.rename(tmp_dir, version_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # switch version atomically, workers pick it up on their next request
+    current_tmp = os.path.join(snapshot_dir, "CURRENT.tmp")
+    with open(current_tmp, "w") as f:
+        f.write(version)
+    os.replace(current_tmp, os.path.join(snapshot_dir, "CURRENT"))
+
+    # remove old versions, files still mapped by a worker stay readable
+    versions = sorted(
+        x
+        for x in os.listdir(snapshot_dir)
+        if not x.startswith(".") and os.path.isdir(os.path.join(snapshot_dir, x))
+    )
+    for old_version in versions[:-SNAPSHOT_KEEP]:
+        shutil.rmtree(os.path.join(snapshot_dir, old_version), ignore_errors=True)
+    return version
+
+
+def read_snapshot_version(snapshot_dir, version):
+    # convert the tables of a version to dataframes, once per worker and version
+    data = {}
+    version_dir = os.path.join(snapshot_dir, version)
+    for filename in os.listdir(version_dir):
+        source = pa.memory_map(os.path.join(version_dir, filename), "r")
+        table = pa.ipc.open_file(source).read_all()
+        rotation_no = json.loads(table.schema.metadata[b"rotation_no"])
+        data[filename[: -len(".arrow")]] = table.to_pandas(), rotation_no
+    return data
+
+
+def read_snapshot(snapshot_dir, name):
+    # read the current snapshot, reload only when the version changed
+    current_path = os.path.join(snapshot_dir, "CURRENT")
+    for attempt in range(2):
+        if not os.path.exists(current_path):
+            return None
+        with open(current_path) as f:
+            version = f.read().strip()
+        current = _snapshot["current"]
+        if version == current[0]:
+            break
+        try:
+            current = version, read_snapshot_version(snapshot_dir, version)
+            _snapshot["current"] = current
+            break
+        except FileNotFoundError:
+            # version pruned by a newer sync in the meantime, read CURRENT again
+            continue
+    else:
+        return None
+
+    version, tables = current
+    created = datetime.strptime(version, SNAPSHOT_VERSION_FORMAT)
+    created = created.replace(tzinfo=timezone.utc)
+    age = (datetime.now(timezone.utc) - created).total_seconds()
+    if age > SNAPSHOT_MAX_AGE:
+        app.logger.warning(
+            f"snapshot {version} is {age:.0f} seconds old, is the sync running?"
+        )
+        return None
+
+    data = {}
+    for kind in ASSET_KEYS:
+        if f"{name}.{kind}" not in tables:
+            return None
+        data[kind] = tables[f"{name}.{kind}"]
+    # process_data gets its own copy, like from the cache
+    return copy_data(data)
+
+
+def load_data(name):
+    # read from the shared snapshot if there is one, otherwise from the cache/kobo
+    snapshot_dir = os.getenv("SNAPSHOTDIR")
+    if snapshot_dir:
+        snapshot = read_snapshot(snapshot_dir, name)
+        if snapshot is not None:
+            return snapshot
+    return get_cached_operation(name)
+
+
+@app.cli.command("sync")
+def sync_snapshot():
+    """Fetch data of all operations and publish it as a new snapshot in SNAPSHOTDIR."""
+    snapshot_dir = os.getenv("SNAPSHOTDIR")
+    if not snapshot_dir:
+        raise SystemExit("SNAPSHOTDIR is not set")
+    os.makedirs(snapshot_dir, exist_ok=True)
+    print(f"published snapshot {write_snapshot(snapshot_dir)}")
+
+
+def count_uncompressed(response):
+    # sent as is, counted like the uncompressed blob uploads
+    # Content-Length is set by render_template and send_file, no need to read files
+    if response.content_length is not None:
+        count_bytes("response", response.content_length, response.content_length)
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    # compress responses with brotli or gzip, if the client accepts it
+    # moderate levels, compressing on every request at the maximum costs too much cpu
+    if response.status_code != 200 or "Content-Encoding" in response.headers:
+        return response
+    # generators are streamed on purpose, their size is not known
+    if response.is_streamed and not response.direct_passthrough:
+        return response
+    if response.mimetype.startswith(COMPRESSED_MIMETYPES):
+        return count_uncompressed(response)
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(["br", "gzip"])
+    if encoding is None:
+        return count_uncompressed(response)
+    response.direct_passthrough = False
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        count_bytes("response", len(data), len(data))
+        return response
+    if encoding == "br":
+        data_compressed = brotli.compress(data, quality=5)
+    else:
+        data_compressed = gzip.compress(data, compresslevel=6)
+    if len(data_compressed) >= len(data):
+        count_bytes("response", len(data), len(data))
+        return response
+    response.set_data(data_compressed)
+    response.headers["Content-Encoding"] = encoding
+    response.headers.pop("Accept-Ranges", None)
+    if response.get_etag()[0]:
+        response.set_etag(f"{response.get_etag()[0]}-{encoding}")
+    count_bytes("response", len(data), len(data_compressed))
+    return response
+
+
+def get_operation_name():
+    # operation logged into at /data
+    name = session.get("operation")
+    if name in OPERATIONS:
+        return name
+    return None
+
+
+@app.errorhandler(FetchTimeoutError)
+@app.errorhandler(requests.exceptions.Timeout)
+def fetch_timeout(error):
+    message = "Could not get the data in time, please try again later."
+    return render_template("home.html", message=message), 504
+
+
 @app.route("/data", methods=["POST"])
 def default_page():
-    if request.form["password"] == os.getenv("PASSWORD"):
-        df_form, rotation_no = get_data(os.getenv("ASSET"))
-        return process_data(df_form)
-    else:
-        return render_template("home.html")
+    for name, operation in OPERATIONS.items():
+        if request.form["password"] == operation["password"]:
+            session["operation"] = name
+            return process_data(load_data(name), name)
+    session.pop("operation", None)
+    return render_template("home.html")
 
 
 @app.route("/sendreport", methods=["POST"])
@@ -514,15 +922,20 @@ def send_report():
     else:
         rescue_number = None
         email = ""
+    name = get_operation_name()
+    if name is None:
+        return render_template("home.html")
+    operation = OPERATIONS[name]
 
     dataname = "report_data"
-    df_form, rotation_no = get_data(os.getenv("ASSET"))
+    data = load_data(name)
+    df_form, rotation_no = data["form"]
     if "rescue_number" in df_form.columns:
         rescues = df_form["rescue_number"].unique().tolist()
     else:
         rescues = []
     df_rescue_dates = df_form.groupby("rescue_number")["_submission_time"].min()
-    report_template, report_data = process_data(df_form, rescue_number, report=True)
+    report_template, report_data = process_data(data, name, rescue_number, report=True)
 
     filename = dataname + "_general.csv"
     df_metadata = pd.DataFrame()
@@ -547,7 +960,7 @@ def send_report():
         df_metadata.at[rescue_number, "date"] = df_rescue_dates.loc[rescue_number]
         df_metadata.at[rescue_number, "medevac"] = report_data["medevacs"]
     df_metadata.to_csv(filename)
-    upload_blob("reporting", filename, filename)
+    upload_blob(operation["container"], filename, filename)
 
     filename = dataname + "_medevacs.csv"
     df_medevac = pd.DataFrame()
@@ -562,7 +975,7 @@ def send_report():
             "medevac_date"
         ]
     df_medevac.to_csv(filename)
-    upload_blob("reporting", filename, filename)
+    upload_blob(operation["container"], filename, filename)
 
     filename = dataname + "_peopleonboard.csv"
     df_peopleonboard = pd.DataFrame()
@@ -604,7 +1017,7 @@ def send_report():
     df_peopleonboard.at["TOTAL", "Females"] = report_data["females"]
     df_peopleonboard.at["TOTAL", "Total"] = report_data["total"]
     df_peopleonboard.to_csv(filename)
-    upload_blob("reporting", filename, filename)
+    upload_blob(operation["container"], filename, filename)
 
     filename = dataname + "_nationalities.csv"
     df_nationalities = pd.DataFrame()
@@ -613,7 +1026,7 @@ def send_report():
         df_nationalities.at[nationality.title(), "Total"] = count[0]
         df_nationalities.at[nationality.title(), "Percentage"] = count[1] / 100.0
     df_nationalities.to_csv(filename)
-    upload_blob("reporting", filename, filename)
+    upload_blob(operation["container"], filename, filename)
 
     filename = dataname + "_age.csv"
     df_age = pd.DataFrame()
@@ -622,7 +1035,7 @@ def send_report():
         df_age.at[age_group, "Total"] = age_count[0]
         df_age.at[age_group, "Percentage"] = age_count[1] / 100.0
     df_age.to_csv(filename)
-    upload_blob("reporting", filename, filename)
+    upload_blob(operation["container"], filename, filename)
 
     filename = dataname + "_disabilities.csv"
     df_disabilities = pd.DataFrame()
@@ -630,7 +1043,7 @@ def send_report():
     df_disabilities.at["all", "Females"] = report_data["disabled_female"]
     df_disabilities.at["all", "Total"] = report_data["disabled"]
     df_disabilities.to_csv(filename)
-    upload_blob("reporting", filename, filename)
+    upload_blob(operation["container"], filename, filename)
 
     filename = dataname + "_pregnant.csv"
     df_pregnant = pd.DataFrame()
@@ -654,10 +1067,10 @@ def send_report():
         + report_data["unacc_minors_female"]
     )
     df_pregnant.to_csv(filename)
-    upload_blob("reporting", filename, filename)
+    upload_blob(operation["container"], filename, filename)
 
     requests.post(
-        url=os.getenv("LOGICAPPTRIGGER"),
+        url=operation["logic_app_trigger"],
         json={"email": email},
         headers={"Content-type": "application/json"},
     )
@@ -671,8 +1084,10 @@ def update_rescue():
         rescue_number = request.form["rescue"]
     else:
         rescue_number = None
-    df_form, rotation_no = get_data(os.getenv("ASSET"))
-    return process_data(df_form, rescue_number)
+    name = get_operation_name()
+    if name is None:
+        return render_template("home.html")
+    return process_data(load_data(name), name, rescue_number)
 
 
 @app.route("/downloaddata", methods=["POST"])
@@ -681,8 +1096,10 @@ def download_data():
         rescue_number = request.form["rescue"]
     else:
         rescue_number = None
-    df_form, rotation_no = get_data(os.getenv("ASSET"))
-    df_form = process_data(df_form, rescue_number, return_data=True)
+    name = get_operation_name()
+    if name is None:
+        return render_template("home.html")
+    df_form = process_data(load_data(name), name, rescue_number, return_data=True)
     data_path = "rescue_data.xlsx"
     if os.path.exists(data_path):
         os.remove(data_path)
@@ -705,6 +1122,13 @@ def download_data():
     return send_file(data_path, as_attachment=True, download_name="rescue-data.xlsx")
 
 
+@app.route("/compressionstats")
+def compression_stats():
+    if get_operation_name() is None:
+        return render_template("home.html")
+    return jsonify(COMPRESSION_STATS)
+
+
 @app.route("/vessellocations")
 def vessel_locations():
     return render_template("vessellocations.html")